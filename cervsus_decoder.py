@@ -1,4 +1,54 @@
+import logging
 import re
+from collections import Counter
+from functools import partial, reduce
+from operator import or_
+
+log = logging.getLogger(__name__)
+
+_ALFABETO = "abcdefghijklmnopqrstuvwxyz"
+_VOCALES = frozenset("aeiou")
+
+# Contextos visuales como bits: la triangulación es un AND de máscaras
+_BITS_CONTEXTO = {
+    "RECETA": 1, "HERBAL": 2, "FARMACIA": 4, "BALNEOLOGIA": 8,
+    "BAÑOS": 16, "ASTRONOMIA": 32, "GENERAL": 64,
+}
+_BIT_GENERAL = _BITS_CONTEXTO["GENERAL"]
+
+# Tablas de rotación César especializadas al importar (índice = desplazamiento)
+_TABLAS_ROTACION = tuple(
+    str.maketrans(_ALFABETO, _ALFABETO[shift:] + _ALFABETO[:shift])
+    for shift in range(26)
+)
+
+# Para cada desplazamiento, índices del texto original que se convierten en
+# vocal tras rotar (v - shift) % 26. Fila 0 sin uso (shift 0 = identidad).
+_ORIGEN_VOCALES = tuple(
+    tuple(sorted((_ALFABETO.index(v) - shift) % 26 for v in _VOCALES))
+    for shift in range(26)
+)
+
+
+def _calcular_estabilidad(vocales, consonantes):
+    """Métrica heurística: ¿Parece lenguaje natural?"""
+    # Penaliza si no hay equilibrio (MDI)
+    return vocales - abs(consonantes - vocales)
+
+
+def _mejor_rotacion(histograma):
+    """Núcleo César sobre enteros: devuelve (mejor_score, mejor_shift)."""
+    total_letras = sum(histograma)
+    mejor_score = -999
+    mejor_shift = 0
+    for shift in range(1, 26):
+        vocales = sum([histograma[i] for i in _ORIGEN_VOCALES[shift]])
+        score = _calcular_estabilidad(vocales, total_letras - vocales)
+        if score > mejor_score:
+            mejor_score = score
+            mejor_shift = shift
+    return mejor_score, mejor_shift
+
 
 class CervsusUniversalEngine:
     """
@@ -8,11 +58,15 @@ class CervsusUniversalEngine:
     Diseñado por Jonathan Abeijon.
     """
 
+    __slots__ = (
+        "diccionario_voynich", "mapa_sufijos",
+        "_lat", "_sig", "_ctx_mascara", "_trie_raices", "_bits_contexto",
+    )
+
     def __init__(self):
-        self.alfabeto = "abcdefghijklmnopqrstuvwxyz"
-        
         # --- CONFIGURACIÓN MOTOR OMEGA (VOYNICH) ---
-        # Diccionario Maestro de Raíces Latinas Técnicas (Validado)
+        # Diccionario Maestro de Raíces Latinas Técnicas (Validado).
+        # Tras editarlo en tiempo de ejecución, llamar a _reconstruir_indices().
         self.diccionario_voynich = {
             "QOK":  {"lat": "COC",  "sig": "COCINAR/DECOCTAR", "ctx": ["RECETA", "HERBAL"]},
             "SHED": {"lat": "SUD",  "sig": "SUDAR/VAPOR",      "ctx": ["BALNEOLOGIA", "BAÑOS"]},
@@ -33,16 +87,37 @@ class CervsusUniversalEngine:
             "IIN": "NI", "OR": "RO", "YS": "S", "TON": "NOT"
         }
 
-    # =========================================================================
-    # UTILIDADES COMPARTIDAS
-    # =========================================================================
-    def _calcular_estabilidad(self, texto):
-        """Métrica heurística: ¿Parece lenguaje natural?"""
-        if not texto: return -100
-        vocales = sum(1 for c in texto if c in "aeiou")
-        consonantes = sum(1 for c in texto if c in "bcdfghjklmnpqrstvwxyz")
-        # Penaliza si no hay equilibrio (MDI)
-        return vocales - abs(consonantes - vocales)
+        self._reconstruir_indices()
+
+    def _reconstruir_indices(self):
+        """
+        Regenera los índices derivados de `diccionario_voynich` (trie, tablas
+        por raíz y máscaras de contexto). El decodificador solo consulta estos
+        índices: tras añadir o modificar raíces hay que llamar a este método.
+        """
+        # Bits de contexto: los conocidos más uno nuevo por contexto no listado
+        self._bits_contexto = dict(_BITS_CONTEXTO)
+        for datos in self.diccionario_voynich.values():
+            for ctx in datos["ctx"]:
+                if ctx not in self._bits_contexto:
+                    self._bits_contexto[ctx] = 1 << len(self._bits_contexto)
+
+        # Tablas paralelas indexadas por identificador de raíz
+        datos_raices = list(self.diccionario_voynich.values())
+        self._lat = [d["lat"] for d in datos_raices]
+        self._sig = [d["sig"] for d in datos_raices]
+        self._ctx_mascara = [
+            reduce(or_, (self._bits_contexto[c] for c in d["ctx"]), 0) for d in datos_raices
+        ]
+
+        # Trie de raíces: búsqueda del prefijo más largo en O(len(palabra)).
+        # Cada nodo terminal guarda la longitud y el identificador de su raíz.
+        self._trie_raices = {}
+        for rid, raiz in enumerate(self.diccionario_voynich):
+            nodo = self._trie_raices
+            for char in raiz:
+                nodo = nodo.setdefault(char, {})
+            nodo["_fin"] = (len(raiz), rid)
 
     # =========================================================================
     # PROTOCOLO A: UNIVERSAL (Motor Alpha - Mecánica v8.0)
@@ -52,98 +127,137 @@ class CervsusUniversalEngine:
         
         # 1. Intento de Rotación Dinámica (César 1-25)
         mejor_score = -999
-        mejor_texto = ""
         mejor_shift = 0
-        
-        for shift in range(1, 26):
-            candidato = ""
-            for char in texto.lower():
-                if char in self.alfabeto:
-                    idx = (self.alfabeto.index(char) + shift) % 26
-                    candidato += self.alfabeto[idx]
-                else:
-                    candidato += char
-            
-            score = self._calcular_estabilidad(candidato)
-            if score > mejor_score:
-                mejor_score = score
-                mejor_texto = candidato
-                mejor_shift = shift
-        
+        texto_min = texto.lower()
+
+        # Histograma de letras: el texto se recorre una sola vez y los 25
+        # desplazamientos se puntúan sin construir ningún candidato.
+        conteo = Counter(texto_min)
+        histograma = [conteo[c] for c in _ALFABETO]
+
+        # Texto vacío: ningún candidato supera el umbral
+        if texto_min:
+            mejor_score, mejor_shift = _mejor_rotacion(histograma)
+
         # Umbral de seguridad Universal
         if mejor_score < -2:
             return f"FALLO: Ruido estadístico. Posible cifrado complejo o ruido."
-            
+
+        # Solo se materializa el candidato ganador
+        mejor_texto = texto_min.translate(_TABLAS_ROTACION[mejor_shift])
         return f"ÉXITO (Rotación +{mejor_shift}): {mejor_texto} (Estabilidad: {mejor_score})"
 
     # =========================================================================
     # PROTOCOLO B: VOYNICH (Motor Omega - Lingüística v9.1)
     # =========================================================================
     def _analisis_morfologico(self, palabra):
-        """Separa Raíz y Sufijo Voynich."""
-        palabra = palabra.upper().strip()
+        """
+        Separa Raíz y Sufijo Voynich. Devuelve (id de raíz, sufijo).
+        Espera la palabra ya normalizada (mayúsculas, sin espacios).
+        """
         mejor_match = None
-        match_len = 0
-        
-        for raiz in self.diccionario_voynich.keys():
-            if palabra.startswith(raiz):
-                if len(raiz) > match_len:
-                    match_len = len(raiz)
-                    mejor_match = raiz
-        
+        nodo = self._trie_raices
+
+        # Descenso por el trie recordando la última raíz completa
+        for char in palabra:
+            nodo = nodo.get(char)
+            if nodo is None:
+                break
+            mejor_match = nodo.get("_fin", mejor_match)
+
         if mejor_match:
-            return mejor_match, palabra[len(mejor_match):]
-        
+            longitud, rid = mejor_match
+            return rid, palabra[longitud:]
+
         return None, None
 
-    def _triangulacion_visual(self, datos_raiz, contexto_usuario):
-        """MÓDULO VII - Verifica la coherencia del significado con la imagen."""
-        contextos_validos = datos_raiz["ctx"]
-        
-        if "GENERAL" in contextos_validos:
+    def _triangulacion_visual(self, rid, contexto_usuario, contexto_norm):
+        """
+        MÓDULO VII - Verifica la coherencia del significado con la imagen.
+        `contexto_norm` es `contexto_usuario` ya en mayúsculas.
+        """
+        mascara = self._ctx_mascara[rid]
+
+        if mascara & _BIT_GENERAL:
             return True, "VALIDADO (Contexto Universal)"
             
-        if contexto_usuario.upper() in contextos_validos:
+        if mascara & self._bits_contexto.get(contexto_norm, 0):
             return True, f"VALIDADO (Coincide con {contexto_usuario})"
             
-        return False, f"ALERTA DE INCONSISTENCIA: La palabra es '{datos_raiz['sig']}' pero el contexto es '{contexto_usuario}'."
+        return False, f"ALERTA DE INCONSISTENCIA: La palabra es '{self._sig[rid]}' pero el contexto es '{contexto_usuario}'."
 
-    def _motor_omega_voynich(self, palabra, contexto_visual):
+    def _motor_omega_voynich(self, palabra, contexto_visual, contexto_norm):
         """Analiza Voynich usando la morfología inversa y la Triangulación."""
         
-        raiz_v, sufijo_v = self._analisis_morfologico(palabra)
+        palabra = palabra.upper().strip()
+        rid, sufijo_v = self._analisis_morfologico(palabra)
         
-        if not raiz_v:
+        if rid is None:
             return "FALLO: Raíz desconocida en Diccionario Maestro."
 
-        sufijo_lat = self.mapa_sufijos.get(sufijo_v, sufijo_v[::-1])
+        # Los sufijos no listados se invierten letra a letra
+        sufijo_lat = self.mapa_sufijos.get(sufijo_v)
+        if sufijo_lat is None:
+            sufijo_lat = sufijo_v[::-1]
         
-        datos = self.diccionario_voynich[raiz_v]
-        reconstruccion = f"{datos['lat']}{sufijo_lat}"
+        reconstruccion = f"{self._lat[rid]}{sufijo_lat}"
 
-        validado, mensaje_validacion = self._triangulacion_visual(datos, contexto_visual)
+        validado, mensaje_validacion = self._triangulacion_visual(rid, contexto_visual, contexto_norm)
 
         if not validado:
             return f"RECHAZADO POR TRIANGULACIÓN: {mensaje_validacion}"
 
-        return f"ÉXITO: {datos['sig']} ({reconstruccion}) - {mensaje_validacion}"
+        return f"ÉXITO: {self._sig[rid]} ({reconstruccion}) - {mensaje_validacion}"
 
     # =========================================================================
     # ROUTER PRINCIPAL (DISPATCHER)
     # =========================================================================
-    def decodificar(self, entrada, modo="UNIVERSAL", contexto_visual=None):
+    def _resolver_motor(self, modo, contexto_visual):
         """
         Selector de Protocolos: Encapsula el conocimiento de CERVSUS.
+        Devuelve (motor, error): el motor (entrada -> resultado) con error
+        None, o motor None y el mensaje de error.
         """
-        print(f"\n--- EJECUTANDO CERVSUS v10.0 | MODO: {modo} ---")
-        
         if modo == "UNIVERSAL":
-            return self._motor_alpha_mecanico(entrada)
+            return self._motor_alpha_mecanico, None
         
         elif modo == "VOYNICH":
             if not contexto_visual:
-                return "ERROR: El modo VOYNICH requiere un 'contexto_visual' (Ej: RECETA, BAÑOS) para evitar alucinaciones."
-            return self._motor_omega_voynich(entrada, contexto_visual)
+                return None, "ERROR: El modo VOYNICH requiere un 'contexto_visual' (Ej: RECETA, BAÑOS) para evitar alucinaciones."
+            motor = partial(
+                self._motor_omega_voynich,
+                contexto_visual=contexto_visual,
+                contexto_norm=contexto_visual.upper(),
+            )
+            return motor, None
         
         else:
-            return "ERROR: Modo desconocido."
+            return None, "ERROR: Modo desconocido."
+
+    def decodificar(self, entrada, modo="UNIVERSAL", contexto_visual=None):
+        """
+        Decodifica una entrada con el protocolo indicado por `modo`.
+        """
+        log.debug("--- EJECUTANDO CERVSUS v10.0 | MODO: %s ---", modo)
+
+        motor, error = self._resolver_motor(modo, contexto_visual)
+        if error is not None:
+            return error
+        return motor(entrada)
+
+    def decodificar_batch(self, entradas, modo="UNIVERSAL", contexto_visual=None):
+        """
+        Decodifica una lista de entradas con el mismo modo y contexto.
+        El protocolo se resuelve una sola vez para todo el lote y cada
+        entrada distinta se decodifica una sola vez (un códice recorrido
+        palabra a palabra repite mucho vocabulario). Acepta cualquier iterable.
+        """
+        entradas = list(entradas)
+        log.debug("--- EJECUTANDO CERVSUS v10.0 | MODO: %s | LOTE: %d ---", modo, len(entradas))
+
+        motor, error = self._resolver_motor(modo, contexto_visual)
+        if error is not None:
+            return [error] * len(entradas)
+
+        unicos = {entrada: motor(entrada) for entrada in dict.fromkeys(entradas)}
+        return [unicos[entrada] for entrada in entradas]